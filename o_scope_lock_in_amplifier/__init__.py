@@ -1,21 +1,65 @@
 """Turn your oscilloscope into a lock in amplifier with this one simple trick!"""
 
-from typing import Type
+import importlib
+import os
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Type
 
-from o_scope_lock_in_amplifier.ds1054z import DS1054z
 from o_scope_lock_in_amplifier.oscilloscope_utils import OScope
 
-scope_types: list[Type[OScope]]
+if TYPE_CHECKING:
+    from o_scope_lock_in_amplifier.ds1054z import DS1054z  # noqa: F401
+    from o_scope_lock_in_amplifier.ps6000e import PS6000E  # noqa: F401
 
-try:
-    from o_scope_lock_in_amplifier.ps6000e import PS6000E
+# The GUI embeds Matplotlib in Qt, so point Matplotlib at the Qt backend up
+# front (without importing it) instead of letting it probe for one, unless the
+# user has chosen a backend themselves
+if not os.environ.get("MPLBACKEND"):
+    os.environ["MPLBACKEND"] = "QtAgg"
 
-except ImportError:
-    scope_types = [
-        DS1054z,
-    ]
-else:
-    scope_types = [
-        DS1054z,
-        PS6000E,
-    ]
+scope_types: List[Type[OScope]]
+
+
+def _scope_loader(module: str, class_name: str) -> Callable[[], Type[OScope]]:
+    def load() -> Type[OScope]:
+        scope_class: Type[OScope] = getattr(
+            importlib.import_module(f".{module}", __name__), class_name
+        )
+        return scope_class
+
+    return load
+
+
+# Supported oscilloscopes by class name. Each driver module (and the vendor
+# library behind it) is only imported when that scope is asked for.
+_SCOPE_LOADERS: Dict[str, Callable[[], Type[OScope]]] = {
+    "DS1054z": _scope_loader("ds1054z", "DS1054z"),
+    "PS6000E": _scope_loader("ps6000e", "PS6000E"),
+}
+
+_available_scope_types: Optional[List[Type[OScope]]] = None
+
+
+def get_scope_types() -> List[Type[OScope]]:
+    """Return the oscilloscope classes whose drivers can be imported."""
+    global _available_scope_types
+    if _available_scope_types is None:
+        _available_scope_types = []
+        for load in _SCOPE_LOADERS.values():
+            try:
+                _available_scope_types.append(load())
+            except ImportError:
+                # Driver (e.g. the PicoScope SDK) isn't installed
+                pass
+    return _available_scope_types
+
+
+def __getattr__(name: str) -> Any:
+    # Scope drivers are imported on first access (PEP 562), so importing the
+    # package doesn't pay for the instrument libraries until they're needed.
+    if name in _SCOPE_LOADERS:
+        return _SCOPE_LOADERS[name]()
+
+    if name == "scope_types":
+        return get_scope_types()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,11 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 import logging
 import time
+from typing import TYPE_CHECKING, Optional
 
 import numpy as np
-import pyvisa
-from tqdm.auto import trange
 
 from o_scope_lock_in_amplifier.oscilloscope_utils import (
     AcquisitionData,
@@ -12,9 +14,70 @@ from o_scope_lock_in_amplifier.oscilloscope_utils import (
     allowed_vals,
 )
 
+if TYPE_CHECKING:
+    import pyvisa
+
 logger = logging.getLogger("o_scope_lock_in_amplifier")
 
 
+@dataclass(frozen=True)
+class _WaveformPreamble:
+    format: int
+    mode: int
+    points: int
+    count: int
+    x_increment: float
+    x_origin: float
+    x_reference: int
+    y_increment: float
+    y_origin: float
+    y_reference: int
+
+
+def _parse_ieee_block(raw: bytes, dtype: np.dtype) -> np.ndarray:
+    """
+    Wrap the payload of an IEEE 488.2 definite-length block (#<n><length><data>).
+
+    The returned array is a read-only view into ``raw``; no copy is made.
+    """
+    if raw[:1] != b"#":
+        raise RuntimeError(f"Malformed binary block header: {raw[:12]!r}")
+    header_len = 2 + int(chr(raw[1]))
+    payload_len = int(raw[2:header_len])
+    return np.frombuffer(
+        raw,
+        dtype=dtype,
+        offset=header_len,
+        count=payload_len // dtype.itemsize,
+    )
+
+
+def _convert_to_voltage(
+    raw: np.ndarray,
+    out: np.ndarray,
+    voltage_reference: int,
+    voltage_increment: float,
+    voltage_origin: float,
+) -> None:
+    """
+    Compute ``(raw - reference) * increment - origin`` into ``out``, in place.
+
+    Every step writes into ``out``, so no full-size temporaries are allocated.
+    """
+    np.subtract(raw, voltage_reference, out=out, dtype=out.dtype)
+    out *= voltage_increment
+    out -= voltage_origin
+
+
+@lru_cache(maxsize=None)
+def _resource_manager() -> "pyvisa.ResourceManager":
+    # pyvisa enumerates its backends on import, so only pay for it once a
+    # DS1054z is actually being opened, and share one manager between them
+    import pyvisa
+
+    return pyvisa.ResourceManager()
+
+
 class DS1054z(OScope):
     def __init__(
         self,
@@ -24,25 +87,33 @@ class DS1054z(OScope):
     ) -> None:
         super().__init__(ref_channel, acquisition_channel)
 
-        self.rm = pyvisa.ResourceManager()
+        self.rm = _resource_manager()
         if conn_str == "auto":
-            for r in self.rm.list_resources():
-                if r.startswith("USB"):
-                    conn_str = r
-                    break
-        if conn_str == "auto":
-            raise RuntimeError(
-                "Could not find a USB Device! Try passing a conn_string; e.x. for IP TCPIP::<ip address>::inst0::INSTR\nFound:\n\t"
-                + "\n\t".join(self.rm.list_resources())
-            )
+            # Enumerating resources probes every VISA backend, so do it once
+            resources = self.rm.list_resources()
+            usb_resource = next((r for r in resources if r.startswith("USB")), None)
+            if usb_resource is None:
+                raise RuntimeError(
+                    "Could not find a USB Device! Try passing a conn_string; e.x. for IP TCPIP::<ip address>::inst0::INSTR\nFound:\n\t"
+                    + "\n\t".join(resources)
+                )
+            conn_str = usb_resource
         self.scope: pyvisa.resources.usb.USBInstrument = self.rm.open_resource(  # type: ignore
             conn_str
         )
+        # Read a full 125k-point batch (250 kB in WORD format) in one bulk
+        # transfer instead of pyvisa's default 20 kB chunks, and allow enough
+        # time for it to arrive
+        self.scope.chunk_size = 256 * 1024
+        self.scope.timeout = 30_000  # ms
         self.idn = self.scope.query("*IDN?")
 
         self.ref_channel = ref_channel
         self.acquisition_channel = acquisition_channel
 
+        # Preamble of the most recent waveform read, for its time base
+        self._last_preamble: Optional[_WaveformPreamble] = None
+
         self.setup_capture(memory_depth=6_000)
 
         logger.debug(f"Connected to {self.idn}")
@@ -51,33 +122,71 @@ class DS1054z(OScope):
     def setup_capture(
         self,
         memory_depth: int = 12_000_000,
+        word_format: bool = False,
     ) -> None:
-        self.scope.write(":RUN")
-        time.sleep(0.25)
-        # Disable all non-selected channels, and enable the selected ones
-        for channel in OscilloscopeChannels:
-            if channel in (self.ref_channel, self.acquisition_channel):
-                # Enable selected channels
-                self.scope.write(f":CHANnel{channel.value}:DISPlay ON")
-            else:
-                # Disable non-selected channels
-                self.scope.write(f":CHANnel{channel.value}:DISPlay OFF")
-
-        self.scope.write(f":ACQuire:MDEPth {memory_depth}")
-        time.sleep(0.1)
-        self.scope.write(":WAVeform:FORMat BYTE")
-        time.sleep(0.1)
-        self.scope.write(":WAVeform:MODE NORMal")
-        time.sleep(0.1)
-        self.scope.write(":TRIG:SWE SING")
-        time.sleep(0.1)
+        # WORD transfers two little-endian bytes per point, which can be wrapped
+        # directly as uint16; BYTE halves the bytes on the wire
+        self._sample_dtype = np.dtype("<u2") if word_format else np.dtype(np.uint8)
+
+        # Enable the selected channels and disable all the others
+        selected = (self.ref_channel, self.acquisition_channel)
+        channel_display = ";".join(
+            f":CHANnel{channel.value}:DISPlay {'ON' if channel in selected else 'OFF'}"
+            for channel in OscilloscopeChannels
+        )
+
+        commands = [
+            ":RUN",
+            channel_display,
+            f":ACQuire:MDEPth {memory_depth}",
+            f":WAVeform:FORMat {'WORD' if word_format else 'BYTE'}",
+            ":WAVeform:MODE NORMal",
+            ":TRIG:SWE SING",
+        ]
+
+        # Send the whole setup as one semicolon-chained message, then wait for
+        # the scope to finish processing it rather than sleeping between writes
+        self.scope.write(";".join(commands))
+        self.scope.query("*OPC?")
         total_points = int(self.scope.query(":ACQuire:MDEPth?"))
 
         assert total_points == memory_depth
 
+    def _query_preamble(self) -> _WaveformPreamble:
+        # One :WAVeform:PREamble? round-trip returns every scaling parameter for
+        # the current source, instead of querying them one at a time
+        (
+            fmt,
+            mode,
+            points,
+            count,
+            x_increment,
+            x_origin,
+            x_reference,
+            y_increment,
+            y_origin,
+            y_reference,
+        ) = (
+            self.scope.query(":WAVeform:PREamble?").strip().split(",")
+        )
+        return _WaveformPreamble(
+            format=int(fmt),
+            mode=int(mode),
+            points=int(points),
+            count=int(count),
+            x_increment=float(x_increment),
+            x_origin=float(x_origin),
+            x_reference=int(x_reference),
+            y_increment=float(y_increment),
+            y_origin=float(y_origin),
+            y_reference=int(y_reference),
+        )
+
     def read_waveform_in_batches(
         self, channel: OscilloscopeChannels, max_points_per_read: int = 125000
     ) -> np.ndarray:
+        from tqdm.auto import trange
+
         logger.debug(f"Getting data for channel {channel}")
 
         # Stop the oscilloscope to read from internal memory
@@ -90,9 +199,10 @@ class DS1054z(OScope):
         self.scope.write(f":WAVeform:SOURce CHANnel{channel.value}")
 
         # Retrieve the scaling factors for voltage conversion
-        voltage_increment = float(self.scope.query(":WAVeform:YINCrement?"))
-        voltage_origin = float(self.scope.query(":WAVeform:YORigin?"))
-        voltage_reference = int(self.scope.query(":WAVeform:YREFerence?"))
+        preamble = self._last_preamble = self._query_preamble()
+        voltage_increment = preamble.y_increment
+        voltage_origin = preamble.y_origin
+        voltage_reference = preamble.y_reference
         logger.debug(f"\t{voltage_origin=}")
         logger.debug(f"\t{voltage_increment=}")
         logger.debug(f"\t{voltage_reference=}")
@@ -100,52 +210,77 @@ class DS1054z(OScope):
         if voltage_reference == 4294967295:
             raise RuntimeError("Empty Data! No data in memory.")
 
-        # Initialize data storage for waveform data
-        all_waveform_data = []
+        # Preallocate storage for the full waveform
+        all_waveform_data = np.empty(total_points, dtype=np.float32)
 
         # Calculate the number of batches (ceiling division)
         num_batches = (total_points + max_points_per_read - 1) // max_points_per_read
 
-        # Read waveform data in batches
-        for batch in trange(num_batches, desc=f"Reading {channel}"):
-            start_point = batch * max_points_per_read + 1
-            stop_point = min((batch + 1) * max_points_per_read, total_points)
-
-            # Set the start and stop points for the current batch
-            self.scope.write(f":WAVeform:STARt {start_point}")
-            self.scope.write(f":WAVeform:STOP {stop_point}")
-
-            # Read the raw data from the current batch
-            raw_waveform_data = self.scope.query_binary_values(
-                ":WAVeform:DATA?", datatype="B", is_big_endian=True
-            )
-
-            # Convert the raw data to voltage using the scaling factors
-            voltage_data = [
-                (d - voltage_reference) * voltage_increment - voltage_origin
-                for d in raw_waveform_data
-            ]
-
-            # Append the voltage data to the waveform data list
-            all_waveform_data.extend(voltage_data)
-
-        # Convert the list of voltage data to a NumPy array and return it
-        return np.array(all_waveform_data)
+        # Read waveform data in batches. All VISA I/O stays on this thread; the
+        # voltage conversion of each batch is handed to a worker so it overlaps
+        # with the USB transfer of the next one.
+        with ThreadPoolExecutor(max_workers=1) as converter:
+            conversions: list[Future[None]] = []
+            for batch in trange(num_batches, desc=f"Reading {channel}"):
+                start_point = batch * max_points_per_read + 1
+                stop_point = min((batch + 1) * max_points_per_read, total_points)
+
+                # Set the start and stop points for the current batch
+                self.scope.write(f":WAVeform:STARt {start_point}")
+                self.scope.write(f":WAVeform:STOP {stop_point}")
+
+                # Read the raw data from the current batch
+                self.scope.write(":WAVeform:DATA?")
+                raw_waveform_data = _parse_ieee_block(
+                    self.scope.read_raw(), self._sample_dtype
+                )
+
+                # Convert the raw data to voltage using the scaling factors,
+                # writing it straight into this batch's slice of the output
+                conversions.append(
+                    converter.submit(
+                        _convert_to_voltage,
+                        raw_waveform_data,
+                        all_waveform_data[start_point - 1 : stop_point],
+                        voltage_reference,
+                        voltage_increment,
+                        voltage_origin,
+                    )
+                )
+
+            # Re-raise any conversion error
+            for conversion in conversions:
+                conversion.result()
+
+        return all_waveform_data
 
     def get_data(self) -> AcquisitionData:
         self.scope.write(":RUN")
         self.scope.write(":TRIG:SWE SING")
         self.scope.write(":TFOR")
+
+        # Poll with an exponential backoff so long captures don't generate a
+        # USB round-trip every 100 ms
+        poll_interval = 0.02
+        last_stat = None
         while (stat := self.scope.query(":TRIG:STAT?").strip()) != "STOP":
             logger.debug(f":TRIG:STAT? = {stat}")
-            if stat == "WAIT":
+            if stat == "WAIT" and last_stat != "WAIT":
+                # The first :TFOR can land before the scope is armed; force the
+                # trigger again once it reports it's waiting for one
                 self.scope.write(":TFOR")
-            time.sleep(0.1)
+            last_stat = stat
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * 1.5, 0.5)
 
         ref_dat = self.read_waveform_in_batches(self.ref_channel)
         aqu_dat = self.read_waveform_in_batches(self.acquisition_channel)
-        time_increment = float(self.scope.query(":WAVeform:XINCrement?"))
-        time_origin = float(self.scope.query(":WAVeform:XORigin?"))
+        # The time base is shared by all channels, so take it from the preamble
+        # of the last channel read
+        preamble = self._last_preamble
+        assert preamble is not None
+        time_increment = preamble.x_increment
+        time_origin = preamble.x_origin
 
         logger.info(f"Got {time_increment * len(ref_dat)} sec of data")
 
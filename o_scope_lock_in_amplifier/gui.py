@@ -1,14 +1,18 @@
 import csv
+from dataclasses import dataclass
 import logging
 import math
+import queue
 import sys
+import threading
 import time
-from typing import Dict, List, Optional, Union
+from typing import Dict, Optional, Tuple, Union
 
-from PySide6.QtCore import QObject, Qt, QThread, Signal
+from PySide6.QtCore import QObject, Qt, QThread, QTimer, Signal
 from PySide6.QtGui import QAction, QCloseEvent
 from PySide6.QtWidgets import (
     QApplication,
+    QCheckBox,
     QDoubleSpinBox,
     QFileDialog,
     QFormLayout,
@@ -25,21 +29,42 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QWidget,
 )
-from matplotlib import pyplot as plt
-from matplotlib.ticker import FuncFormatter
 import numpy as np
 
 from o_scope_lock_in_amplifier.lock_in_proc import (
     generate_reference_signals,
     perform_lock_in,
+    perform_lock_in_scalar,
 )
-from o_scope_lock_in_amplifier.oscilloscope_utils import OScope
+from o_scope_lock_in_amplifier.oscilloscope_utils import AcquisitionData, OScope
 from o_scope_lock_in_amplifier.plot_widget import PlotWidget
 from o_scope_lock_in_amplifier.setup_panel import SetupPanel
 
 logger = logging.getLogger("o_scope_lock_in_amplifier")
 
 
+# SI prefixes from 1e-24 to 1e24, indexed by exponent // 3 + 8
+_SI_PREFIXES = (
+    "y",
+    "z",
+    "a",
+    "f",
+    "p",
+    "n",
+    "μ",
+    "m",
+    "",
+    "k",
+    "M",
+    "G",
+    "T",
+    "P",
+    "E",
+    "Z",
+    "Y",
+)
+
+
 def format_si_prefix(value: float, unit: str) -> str:
     """
     Formats a value with SI prefix.
@@ -55,32 +80,30 @@ def format_si_prefix(value: float, unit: str) -> str:
         return f"NaN {unit}"
     if value == 0:
         return f"0 {unit}"
-    exponent = int(np.floor(np.log10(abs(value)) / 3) * 3)
+    exponent = int(math.floor(math.log10(abs(value)) / 3) * 3)
     exponent = min(max(exponent, -24), 24)
     value_scaled = value / (10**exponent)
-    prefixes = {
-        -24: "y",
-        -21: "z",
-        -18: "a",
-        -15: "f",
-        -12: "p",
-        -9: "n",
-        -6: "μ",
-        -3: "m",
-        0: "",
-        3: "k",
-        6: "M",
-        9: "G",
-        12: "T",
-        15: "P",
-        18: "E",
-        21: "Z",
-        24: "Y",
-    }
-    prefix = prefixes.get(exponent, "")
+    prefix = _SI_PREFIXES[exponent // 3 + 8]
     return f"{value_scaled:.3f} {prefix}{unit}"
 
 
+# Live results average the demodulated record over whole reference periods,
+# which is itself the low-pass filter, so the filter settings only apply in
+# some cases
+_FILTER_NOTE = (
+    "Used by Debug Run, and by live results when the averaging window holds "
+    "fewer than 4 reference periods"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class LockInSettings:
+    low_pass_cutoff: float
+    filter_order: int
+    averaging_length: float
+    clean_reference: bool
+
+
 class LockInSettingsPanel(QWidget):
     """
     A panel to configure lock-in amplifier parameters.
@@ -99,11 +122,13 @@ class LockInSettingsPanel(QWidget):
         self.low_pass_cutoff_input.setRange(0.1, 10000.0)
         self.low_pass_cutoff_input.setValue(10.0)
         self.low_pass_cutoff_input.setSuffix(" Hz")
+        self.low_pass_cutoff_input.setToolTip(_FILTER_NOTE)
 
         # Filter order
         self.filter_order_input = QSpinBox()
         self.filter_order_input.setRange(1, 10)
         self.filter_order_input.setValue(4)
+        self.filter_order_input.setToolTip(_FILTER_NOTE)
 
         # Averaging length (as fraction of data length)
         self.averaging_length_input = QDoubleSpinBox()
@@ -111,11 +136,26 @@ class LockInSettingsPanel(QWidget):
         self.averaging_length_input.setSingleStep(0.1)
         self.averaging_length_input.setValue(0.5)
         self.averaging_length_input.setSuffix(" (fraction)")
+        self.averaging_length_input.setToolTip(
+            "Fraction of each record the live amplitude and phase are averaged "
+            "over, trimmed to whole reference periods"
+        )
+
+        # Clean-tone reference: find the frequency from zero crossings instead
+        # of an FFT
+        self.clean_reference_input = QCheckBox()
+        self.clean_reference_input.setToolTip(
+            "Faster frequency detection for a clean sine or square wave reference"
+        )
 
         # Add widgets to layout
         layout.addRow("Low-Pass Cutoff Frequency:", self.low_pass_cutoff_input)
         layout.addRow("Filter Order:", self.filter_order_input)
+        filter_note = QLabel(_FILTER_NOTE + ".")
+        filter_note.setWordWrap(True)
+        layout.addRow(filter_note)
         layout.addRow("Averaging Length:", self.averaging_length_input)
+        layout.addRow("Clean-Tone Reference:", self.clean_reference_input)
 
         # Debug Run Button
         self.debug_button = QPushButton("Debug Run")
@@ -131,19 +171,23 @@ class LockInSettingsPanel(QWidget):
         self.averaging_length_input.valueChanged.connect(
             lambda _: self.settings_changed.emit()
         )
+        self.clean_reference_input.toggled.connect(
+            lambda _: self.settings_changed.emit()
+        )
         self.debug_button.clicked.connect(self.debug_run_requested.emit)
 
         self.setLayout(layout)
 
-    def get_settings(self) -> Dict[str, Union[int, float]]:
+    def get_settings(self) -> LockInSettings:
         """
-        Returns the current lock-in settings as a dictionary.
+        Returns a snapshot of the current lock-in settings.
         """
-        return {
-            "low_pass_cutoff": self.low_pass_cutoff_input.value(),
-            "filter_order": self.filter_order_input.value(),
-            "averaging_length": self.averaging_length_input.value(),
-        }
+        return LockInSettings(
+            low_pass_cutoff=self.low_pass_cutoff_input.value(),
+            filter_order=self.filter_order_input.value(),
+            averaging_length=self.averaging_length_input.value(),
+            clean_reference=self.clean_reference_input.isChecked(),
+        )
 
 
 class DataProcessor(QObject):
@@ -152,15 +196,14 @@ class DataProcessor(QObject):
     """
 
     # Define signals to emit processed data
-    amplitude_computed = Signal(float, float)  # (amplitude, timestamp)
-    phase_computed = Signal(float, float)  # (phase, timestamp)
+    result_computed = Signal(float, float, float)  # (amplitude, phase, timestamp)
     finished = Signal()
 
     def __init__(
         self,
         oscilloscope: OScope,
         start_time: float,
-        lock_in_settings: Dict[str, Union[int, float]],
+        lock_in_settings: LockInSettings,
     ) -> None:
         super().__init__()
         self.oscilloscope = oscilloscope
@@ -168,61 +211,127 @@ class DataProcessor(QObject):
         self.start_time = start_time  # Reference start time
         self.lock_in_settings = lock_in_settings
 
+        # Work arrays for the lock-in, allocated on the first record and reused
+        # for every following one of the same length (only floats are taken
+        # from the results, so nothing outlives the next record's overwrite)
+        self._lock_in_buffers: Dict[str, np.ndarray] = {}
+
+        # Acquisition (waiting on the scope) runs on its own thread and hands
+        # records over through a short queue, so the next capture is already
+        # in flight while the previous one is processed. Each item is either
+        # (data, timestamp) or the exception that stopped the acquisition.
+        self._queue: "queue.Queue[Union[Tuple[AcquisitionData, float], Exception]]"
+        self._queue = queue.Queue(maxsize=2)
+        self._acquisition_thread: Optional[threading.Thread] = None
+
+        # A zero-interval timer processes one record per event-loop pass;
+        # waiting on the queue is what paces it, and quitting the thread
+        # takes effect between records.
+        # As a child it follows the worker onto its thread in moveToThread.
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._step)
+
     def run(self) -> None:
         """
-        The main loop that acquires data, processes it, and emits the results.
+        Start acquiring, and processing on the worker thread's event loop.
+        """
+        # The timer can only be stopped from its own thread, which is where
+        # QThread.finished is emitted once the event loop has been quit
+        self.thread().finished.connect(self._timer.stop)
+        self._acquisition_thread = threading.Thread(target=self._acquire, daemon=True)
+        self._acquisition_thread.start()
+        self._timer.start()
+
+    def _acquire(self) -> None:
+        """
+        Acquisition thread: fetch records from the oscilloscope into the queue.
         """
         while self._is_running:
+            item: Union[Tuple[AcquisitionData, float], Exception]
             try:
                 data = self.oscilloscope.get_data()
+                item = (data, time.time() - self.start_time)  # Relative time
+            except Exception as e:
+                item = e
+
+            # Block while the processing side is behind, but keep checking
+            # whether we've been stopped
+            while self._is_running:
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+            if isinstance(item, Exception):
+                return
 
-                # Perform lock-in amplification using the provided settings
-                results = perform_lock_in(
-                    ampl_data=data,
-                    low_pass_cutoff=self.lock_in_settings["low_pass_cutoff"],
-                    filter_order=int(self.lock_in_settings["filter_order"]),
-                )
-
-                # Get amplitude and phase
-                amplitude = results["amplitude"]
-                phase = np.degrees(results["phase"])  # Convert phase to degrees
-
-                # Apply averaging over the specified length
-                avg_length = self.lock_in_settings["averaging_length"]
-                start_idx = int(len(amplitude) * (1 - avg_length))
-                avg_amplitude = np.mean(amplitude[start_idx:])
-                avg_phase = np.mean(phase[start_idx:])
+    def _step(self) -> None:
+        """
+        Process one record from the queue and emit the result.
+        """
+        if not self._is_running:
+            self._timer.stop()
+            return
 
-                current_time = time.time() - self.start_time  # Relative time
+        try:
+            item = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return
 
-                self.amplitude_computed.emit(avg_amplitude, current_time)
-                self.phase_computed.emit(avg_phase, current_time)
+        try:
+            if isinstance(item, Exception):
+                raise item
+            data, current_time = item
+
+            # Only the averaged values are displayed, so reduce straight to
+            # them rather than filtering the whole record (the filter is only
+            # used when the averaging window is too short to average over)
+            results = perform_lock_in_scalar(
+                ampl_data=data,
+                avg_length=self.lock_in_settings.averaging_length,
+                low_pass_cutoff=self.lock_in_settings.low_pass_cutoff,
+                filter_order=self.lock_in_settings.filter_order,
+                clean_reference=self.lock_in_settings.clean_reference,
+                buffers=self._lock_in_buffers,
+            )
+            avg_amplitude = results["amplitude"]
+            avg_phase = math.degrees(results["phase"])
 
-                # Sleep briefly to prevent overwhelming the oscilloscope
-                time.sleep(0.1)  # Adjust as needed
+            self.result_computed.emit(avg_amplitude, avg_phase, current_time)
 
-            except Exception as e:
-                logger.error(f"Error in data processing thread: {e}")
-                self.finished.emit()
-                break
+        except Exception as e:
+            logger.error(f"Error in data processing thread: {e}")
+            self._is_running = False
+            self._timer.stop()
+            self.finished.emit()
 
     def stop(self) -> None:
         """
         Stop the worker loop.
         """
         self._is_running = False
+        # Let an acquisition that's in progress finish before the scope is
+        # used for anything else
+        if self._acquisition_thread is not None:
+            self._acquisition_thread.join()
 
 
 class MainWindow(QMainWindow):
+    _INITIAL_CAPACITY = 4096
+
     def __init__(self) -> None:
         super().__init__()
         self.setWindowTitle("Oscilloscope Lock-In Amplifier")
         self.resize(1200, 800)
 
-        # Initialize data storage lists
-        self.amplitude_data: List[float] = []
-        self.phase_data: List[float] = []
-        self.time_data: List[float] = []
+        # Data storage for export: preallocated arrays filled up to
+        # _n_samples and doubled in size whenever they run out of room
+        self.amplitude_data = np.empty(self._INITIAL_CAPACITY)
+        self.phase_data = np.empty(self._INITIAL_CAPACITY)
+        self.time_data = np.empty(self._INITIAL_CAPACITY)
+        self._n_samples = 0
 
         # Create a central widget with a vertical layout
         central_widget = QWidget()
@@ -252,9 +361,11 @@ class MainWindow(QMainWindow):
         self.main_layout = QVBoxLayout()
         self.main_view.setLayout(self.main_layout)
 
+        from matplotlib.ticker import FuncFormatter
+
         # Plots
         self.amplitude_plot = PlotWidget("Amplitude vs Time", "Time (s)", "Amplitude")
-        self.amplitude_plot.ax.yaxis.set_major_formatter(
+        self.amplitude_plot.set_y_formatter(
             FuncFormatter(lambda y, _: format_si_prefix(y, "V"))
         )
         self.phase_plot = PlotWidget("Phase vs Time", "Time (s)", "Phase (degrees)")
@@ -365,8 +476,7 @@ class MainWindow(QMainWindow):
 
         # Connect signals and slots
         self.worker_thread.started.connect(self.oscilloscope_worker.run)
-        self.oscilloscope_worker.amplitude_computed.connect(self.update_amplitude)
-        self.oscilloscope_worker.phase_computed.connect(self.update_phase)
+        self.oscilloscope_worker.result_computed.connect(self.update_result)
         self.oscilloscope_worker.finished.connect(self.worker_thread.quit)
         self.oscilloscope_worker.finished.connect(self.oscilloscope_worker.deleteLater)
         self.worker_thread.finished.connect(self.worker_thread.deleteLater)
@@ -381,13 +491,12 @@ class MainWindow(QMainWindow):
         logger.info("Data acquisition started.")
 
     def clear_data(self) -> None:
-        self.amplitude_data = []
-        self.phase_data = []
-        self.time_data = []
-        self.amplitude_plot.x_data = []
-        self.amplitude_plot.y_data = []
-        self.phase_plot.x_data = []
-        self.phase_plot.y_data = []
+        # Keep the allocated buffers, just start filling them from the top
+        self._n_samples = 0
+        # Empty the existing plot lines in place rather than swapping out
+        # their data lists behind them
+        self.amplitude_plot.clear()
+        self.phase_plot.clear()
 
     def stop_data_acquisition(self) -> None:
         """
@@ -414,31 +523,30 @@ class MainWindow(QMainWindow):
         else:
             logger.warning("Data acquisition is not running.")
 
-    def update_amplitude(self, amplitude: float, timestamp: float) -> None:
+    def update_result(self, amplitude: float, phase: float, timestamp: float) -> None:
         """
-        Update the amplitude plot and progress bar.
+        Update the amplitude and phase plots and progress bars.
         """
-        # Update amplitude plot with relative time
+        # Update plots with relative time
         self.amplitude_plot.plot(timestamp, amplitude)
+        self.phase_plot.plot(timestamp, phase % 360.0)
 
-        # Append data to lists for export
-        self.amplitude_data.append(amplitude)
-        self.time_data.append(timestamp)
+        # Store data for export
+        n = self._n_samples
+        if n == len(self.time_data):
+            capacity = 2 * n
+            self.amplitude_data = np.resize(self.amplitude_data, capacity)
+            self.phase_data = np.resize(self.phase_data, capacity)
+            self.time_data = np.resize(self.time_data, capacity)
+        self.amplitude_data[n] = amplitude
+        self.phase_data[n] = phase
+        self.time_data[n] = timestamp
+        self._n_samples = n + 1
 
         # Update amplitude progress bar (assuming amplitude ranges 0-100)
         scaled_amp = min(max(amplitude, 0), 100)
         self.current_amplitude_bar.setValue(int(scaled_amp))
 
-    def update_phase(self, phase: float, timestamp: float) -> None:
-        """
-        Update the phase plot and progress bar.
-        """
-        # Update phase plot with relative time
-        self.phase_plot.plot(timestamp, phase % 360.0)
-
-        # Append data to list for export
-        self.phase_data.append(phase)
-
         # Update phase progress bar (0-180 degrees)
         scaled_phase = min(max(phase, 0), 180)
         self.current_phase_bar.setValue(int(scaled_phase))
@@ -447,7 +555,7 @@ class MainWindow(QMainWindow):
         """
         Export the collected data (phase, amplitude, time) to a CSV file.
         """
-        if not self.time_data or not self.amplitude_data or not self.phase_data:
+        if self._n_samples == 0:
             QMessageBox.warning(
                 self,
                 "No Data",
@@ -465,15 +573,17 @@ class MainWindow(QMainWindow):
 
         if file_path:
             try:
+                n = self._n_samples
+                rows = np.column_stack(
+                    (self.time_data[:n], self.amplitude_data[:n], self.phase_data[:n])
+                )
                 with open(file_path, mode="w", newline="") as csv_file:
                     csv_writer = csv.writer(csv_file)
                     # Write header
                     csv_writer.writerow(["Time (s)", "Amplitude", "Phase (degrees)"])
-                    # Write data rows
-                    for t, amp, ph in zip(
-                        self.time_data, self.amplitude_data, self.phase_data
-                    ):
-                        csv_writer.writerow([t, amp, ph])
+                    # Write data rows (as Python floats, so they're written in
+                    # their shortest round-trip form)
+                    csv_writer.writerows(rows.tolist())
 
                 QMessageBox.information(
                     self,
@@ -493,6 +603,9 @@ class MainWindow(QMainWindow):
         """
         Perform a debug run that acquires data once and generates plots.
         """
+        from matplotlib import pyplot as plt
+        from matplotlib.ticker import FuncFormatter
+
         if (
             not hasattr(self.setup_view, "oscilloscope")
             or not self.setup_view.oscilloscope
@@ -522,8 +635,10 @@ class MainWindow(QMainWindow):
         # Perform lock-in amplification
         results = perform_lock_in(
             ampl_data=data,
-            low_pass_cutoff=lock_in_settings["low_pass_cutoff"],
-            filter_order=int(lock_in_settings["filter_order"]),
+            low_pass_cutoff=lock_in_settings.low_pass_cutoff,
+            filter_order=lock_in_settings.filter_order,
+            unwrap=True,
+            clean_reference=lock_in_settings.clean_reference,
         )
 
         # Get time array
@@ -539,7 +654,7 @@ class MainWindow(QMainWindow):
         )
 
         # Compute averaged amplitude and phase over specified length
-        avg_length = lock_in_settings["averaging_length"]
+        avg_length = lock_in_settings.averaging_length
         start_idx = int(len(amplitude) * (1 - avg_length))
         avg_amplitude = np.mean(amplitude[start_idx:])
         avg_phase = np.mean(phase[start_idx:])
@@ -1,112 +1,286 @@
-from typing import cast
+from functools import lru_cache
+import logging
+import math
+from typing import Dict, Optional, cast
 
 from numpy import ndarray
 import numpy as np
-from scipy.fft import fft, fftfreq  # type: ignore
-from scipy.signal import butter, lfilter  # type: ignore
+from scipy.fft import rfft  # type: ignore
+from scipy.signal import butter, sosfilt, sosfilt_zi  # type: ignore
 
 from o_scope_lock_in_amplifier.oscilloscope_utils import AcquisitionData
 
+logger = logging.getLogger("o_scope_lock_in_amplifier")
+
 
 def extract_fundamental_frequency(ref_dat: np.ndarray, time_increment: float) -> float:
     """
     Extracts the fundamental frequency from the reference data using FFT.
     """
     N = len(ref_dat)
-    fft_vals = fft(ref_dat)
-    freqs = fftfreq(N, d=time_increment)
-
-    # Only consider positive frequencies
-    pos_mask = freqs > 0
-    freqs = freqs[pos_mask]
-    fft_vals = fft_vals[pos_mask]
+    # The reference is real, so only the non-negative half of the spectrum is
+    # needed; workers=-1 lets pocketfft use every core on long captures
+    fft_vals = rfft(ref_dat, workers=-1)
+    # Bin spacing of the spectrum (rfftfreq would build every bin's frequency
+    # only for two of them to be read)
+    bin_width = 1.0 / (N * time_increment)
 
-    magnitudes = np.abs(fft_vals)
+    # Skip the DC bin so only positive frequencies are considered
+    magnitudes = np.abs(fft_vals[1:])
 
     # Find the index of the peak in the FFT magnitude spectrum
-    peak_idx = np.argmax(magnitudes)
-    fundamental_freq = float(freqs[peak_idx])  # Ensure it's a float
+    peak_idx = int(np.argmax(magnitudes)) + 1
+    fundamental_freq = peak_idx * bin_width
+
+    # Refine to a fraction of a bin from the peak and its two neighbours
+    # (Jacobsen's three-point estimator; a parabola through the magnitudes is
+    # biased for an unwindowed FFT). Otherwise the reference can be off by up
+    # to half a bin, which shows up as a phase drift across the record.
+    if peak_idx < len(fft_vals) - 1:
+        left, peak, right = fft_vals[peak_idx - 1 : peak_idx + 2]
+        denom = 2 * peak - left - right
+        if denom != 0:
+            delta = float(np.real((left - right) / denom))
+            if abs(delta) < 1:
+                fundamental_freq += delta * bin_width
 
     return fundamental_freq
 
 
+def extract_fundamental_frequency_zc(
+    ref_dat: np.ndarray, time_increment: float
+) -> float:
+    """
+    Extracts the fundamental frequency of a clean single-tone reference from its
+    zero crossings, falling back to the FFT if there are too few of them.
+    """
+    signs = np.signbit(ref_dat)
+    crossings = np.flatnonzero(signs[1:] != signs[:-1])
+    if len(crossings) < 5:
+        return extract_fundamental_frequency(ref_dat, time_increment)
+
+    # Noise around a slow crossing makes it chatter; that's not a clean tone
+    spacing = np.diff(crossings)
+    if spacing.min() < 0.5 * np.median(spacing):
+        return extract_fundamental_frequency(ref_dat, time_increment)
+
+    # Span whole periods (an even number of half periods), so a DC offset on the
+    # reference, which shifts rising and falling crossings oppositely, cancels
+    if len(crossings) % 2 == 0:
+        crossings = crossings[:-1]
+    half_periods = len(crossings) - 1
+
+    def crossing_position(idx: int) -> float:
+        # Linear interpolation between the samples either side of the crossing
+        y0 = float(ref_dat[idx])
+        y1 = float(ref_dat[idx + 1])
+        return idx + (y0 / (y0 - y1) if y0 != y1 else 0.0)
+
+    span = crossing_position(crossings[-1]) - crossing_position(crossings[0])
+    return 0.5 * half_periods / (span * time_increment)
+
+
 def generate_reference_signals(
-    freq: float, N: int, time_increment: float
+    freq: float,
+    N: int,
+    time_increment: float,
+    buffers: Optional[Dict[str, np.ndarray]] = None,
 ) -> tuple[ndarray, ndarray]:
     """
     Generates cosine and sine reference signals at the given frequency with zero phase.
+
+    The arrays are float32. If buffers is given they are written into its
+    "cos_ref" and "sin_ref" arrays (see perform_lock_in).
     """
-    t = np.arange(N) * time_increment
-    cosine_signal = np.cos(2 * np.pi * freq * t)
-    sine_signal = np.sin(2 * np.pi * freq * t)
+    # Build the phase argument once, rather than materialising t and 2*pi*f*t
+    # separately for each of cos and sin. It stays float64 (it grows to
+    # thousands of radians over a record), only the outputs are single precision
+    omega_t = np.arange(N, dtype=np.float64)
+    omega_t *= 2 * np.pi * freq * time_increment
+    float32 = np.dtype(np.float32)
+    cosine_signal = np.cos(omega_t, out=_get_buffer(buffers, "cos_ref", N, float32))
+    sine_signal = np.sin(omega_t, out=_get_buffer(buffers, "sin_ref", N, float32))
     return cosine_signal, sine_signal
 
 
+@lru_cache(maxsize=32)
+def _design_sos(order: int, normal_cutoff: float) -> np.ndarray:
+    """
+    Designs (and caches) a Butterworth low-pass filter as second-order sections.
+    """
+    # Second-order sections stay stable at the very low normalized cutoffs used
+    # here (e.g. 10 Hz at MHz sample rates), where the (b, a) form does not
+    sos = cast(
+        np.ndarray,
+        butter(order, normal_cutoff, btype="low", analog=False, output="sos"),
+    )
+    return sos
+
+
+@lru_cache(maxsize=32)
+def _design_sos_zi(order: int, normal_cutoff: float) -> np.ndarray:
+    """
+    Returns the filter state for a unit step response that has settled.
+    """
+    return cast(np.ndarray, sosfilt_zi(_design_sos(order, normal_cutoff)))
+
+
 def low_pass_filter(
-    signal: np.ndarray, cutoff: float, fs: float, order: int = 5
+    signal: np.ndarray,
+    cutoff: float,
+    fs: float,
+    order: int = 5,
+    initial_value: Optional[complex] = None,
 ) -> np.ndarray:
     """
     Applies a Butterworth low-pass filter to the signal.
+
+    The filter starts settled at initial_value (the first sample by default),
+    rather than at zero, so the output has no start-up transient.
     """
     nyquist = 0.5 * fs
     normal_cutoff = cutoff / nyquist
-    b, a = butter(order, normal_cutoff, btype="low", analog=False)
-    # padlen = min(3 * (max(len(a), len(b)) - 1), len(signal) - 1)
-    filtered_signal = cast(np.ndarray, lfilter(b, a, signal))
-    return filtered_signal
+    sos = _design_sos(order, normal_cutoff)
+    if initial_value is None:
+        initial_value = signal[0]
+    zi = _design_sos_zi(order, normal_cutoff) * initial_value
+    filtered_signal, _ = sosfilt(sos, signal, zi=zi)
+    return cast(np.ndarray, filtered_signal)
+
+
+def _get_buffer(
+    buffers: Optional[Dict[str, np.ndarray]], name: str, N: int, dtype: np.dtype
+) -> np.ndarray:
+    """
+    Returns buffers[name] if it fits, otherwise allocates (and stores) a new one.
+    """
+    if buffers is None:
+        return np.empty(N, dtype=dtype)
+    buf = buffers.get(name)
+    if buf is None or buf.shape != (N,) or buf.dtype != dtype:
+        buf = buffers[name] = np.empty(N, dtype=dtype)
+    return buf
+
+
+# The time base only changes with the scope settings, so the last one is kept.
+# It holds N float64 values (about 96 MB for a 12 M point record); keep maxsize
+# at 1 so no more than one record's worth is ever held
+@lru_cache(maxsize=1)
+def _time_axis(N: int, time_increment: float, time_origin: float) -> np.ndarray:
+    """
+    Returns the (cached, read-only) time of each sample in a record.
+    """
+    t = np.arange(N, dtype=np.float64)
+    t *= time_increment
+    t += time_origin
+    t.flags.writeable = False
+    return t
 
 
 def perform_lock_in(
-    ampl_data: AcquisitionData, low_pass_cutoff: float, filter_order: int = 5
+    ampl_data: AcquisitionData,
+    low_pass_cutoff: float,
+    filter_order: int = 5,
+    unwrap: bool = False,
+    buffers: Optional[Dict[str, np.ndarray]] = None,
+    clean_reference: bool = False,
+    downsample: Optional[int] = None,
+    fundamental_freq: Optional[float] = None,
 ) -> dict:
     """
     Performs lock-in amplification on the provided acquisition data.
+
+    The phase is returned wrapped to (-pi, pi] minus the reference phase unless
+    unwrap is set, which removes 2*pi jumps across the whole trace.
+
+    If buffers is given, the reference signals, the demodulated signal and the
+    amplitude/phase are written into the arrays it holds (allocated into it on
+    the first call), so repeated calls with the same dict reuse them. The
+    returned arrays then alias those buffers and are overwritten by the next
+    call.
+
+    clean_reference finds the reference frequency from zero crossings instead
+    of an FFT, which is much cheaper but only valid for a clean single tone.
+
+    If downsample is greater than 1, only every downsample-th sample of the
+    filtered signal is kept (the last one of each block), so the returned arrays
+    hold N // downsample points. With a cutoff far below the sample rate the
+    filter output carries no more information than that, and the amplitude and
+    phase are only computed for the samples that are kept.
+
+    fundamental_freq skips the frequency measurement when the caller already
+    has it for this acquisition (clean_reference is then unused).
     """
-    ref_dat = ampl_data.ref_dat
-    aqu_dat = ampl_data.aqu_dat
+    # Scope samples carry far less than single precision, so work in float32
+    # (a no-op for drivers that already deliver it)
+    ref_dat = np.asarray(ampl_data.ref_dat, dtype=np.float32)
+    aqu_dat = np.asarray(ampl_data.aqu_dat, dtype=np.float32)
     time_increment = ampl_data.time_increment
     time_origin = ampl_data.time_origin
 
     N = len(ref_dat)
     fs = 1.0 / time_increment  # Sampling frequency
 
-    # Time array
-    t = time_origin + np.arange(N) * time_increment
+    # Time array (read-only, shared with other calls on the same time base)
+    t = _time_axis(N, time_increment, time_origin)
 
     # Extract fundamental frequency from reference data
-    fundamental_freq = extract_fundamental_frequency(ref_dat, time_increment)
-    print(f"Fundamental Frequency: {fundamental_freq:.2f} Hz")
+    if fundamental_freq is None:
+        if clean_reference:
+            fundamental_freq = extract_fundamental_frequency_zc(ref_dat, time_increment)
+        else:
+            fundamental_freq = extract_fundamental_frequency(ref_dat, time_increment)
+        logger.debug(f"Fundamental Frequency: {fundamental_freq:.2f} Hz")
 
     # Generate reference cosine and sine signals with zero phase
-    cos_ref, sin_ref = generate_reference_signals(fundamental_freq, N, time_increment)
+    cos_ref, sin_ref = generate_reference_signals(
+        fundamental_freq, N, time_increment, buffers
+    )
 
-    # Demodulate the acquired data
-    I = aqu_dat * cos_ref  # noqa: E741
-    Q = aqu_dat * sin_ref
+    # Demodulate the acquired data into one complex signal z = I + jQ, so the
+    # low-pass filter below runs once over it rather than over I and Q apart
+    z = _get_buffer(buffers, "z", N, np.dtype(np.complex64))
+    np.multiply(aqu_dat, cos_ref, out=z.real)
+    np.multiply(aqu_dat, sin_ref, out=z.imag)
 
-    # Apply low-pass filter to I and Q
-    I_filtered = low_pass_filter(I, low_pass_cutoff, fs, order=filter_order)
-    Q_filtered = low_pass_filter(Q, low_pass_cutoff, fs, order=filter_order)
+    # Apply low-pass filter to z (the float64 SOS coefficients promote the
+    # filter state, which needs the precision at low cutoffs)
+    # The first sample of z is a point on the 2f ripple, not its mean, so start
+    # the filter from the mean over the first reference period instead
+    period = max(1, min(N, round(fs / fundamental_freq)))
+    z_filtered = low_pass_filter(
+        z,
+        low_pass_cutoff,
+        fs,
+        order=filter_order,
+        initial_value=complex(z[:period].mean()),
+    )
 
-    # plt.plot(I, label="I")
-    # plt.plot(Q, label="Q")
-    # plt.plot(I_filtered, label="I_filtered")
-    # plt.plot(Q_filtered, label="Q_filtered")
-    # plt.legend()
-    # plt.show()
+    # Decimate the filtered signal (views, so nothing is copied)
+    if downsample is not None and downsample > 1:
+        z_filtered = z_filtered[downsample - 1 :: downsample]
+        t = t[downsample - 1 :: downsample]
+    n_out = len(z_filtered)
 
-    # Compute amplitude and phase
-    amplitude = (
-        np.sqrt(I_filtered**2 + Q_filtered**2) * 2
-    )  # Multiply by 2 due to demodulation scaling
-    phase = np.arctan2(Q_filtered, I_filtered)
+    # Compute amplitude and phase straight into their output buffers
+    amplitude = _get_buffer(buffers, "amplitude", n_out, z_filtered.real.dtype)
+    np.abs(z_filtered, out=amplitude)
+    amplitude *= 2  # Multiply by 2 due to demodulation scaling
+    phase = _get_buffer(buffers, "phase", n_out, z_filtered.real.dtype)
+    np.arctan2(z_filtered.imag, z_filtered.real, out=phase)
 
     # Correct phase offset due to zero phase reference
-    ref_phase = np.arctan2(np.mean(ref_dat * sin_ref), np.mean(ref_dat * cos_ref))
-    phase_corrected = phase - ref_phase
+    # (dot products reduce without allocating the element-wise products; the
+    # 1/N of the means cancels inside atan2)
+    ref_phase = math.atan2(
+        float(np.dot(ref_dat, sin_ref)), float(np.dot(ref_dat, cos_ref))
+    )
+    phase -= ref_phase
+    phase_corrected = phase
 
-    # Unwrap phase to prevent discontinuities
-    phase_corrected = phase_corrected
+    # Unwrap phase to prevent discontinuities (only worth it for full traces)
+    if unwrap:
+        phase_corrected = np.unwrap(phase_corrected)
 
     return {
         "time": t,
@@ -114,3 +288,96 @@ def perform_lock_in(
         "phase": phase_corrected,
         "fundamental_freq": fundamental_freq,
     }
+
+
+# Fewest whole reference periods the averaging window of perform_lock_in_scalar
+# has to hold; below that it falls back to the low-pass filter
+_MIN_AVERAGED_PERIODS = 4
+
+
+def perform_lock_in_scalar(
+    ampl_data: AcquisitionData,
+    avg_length: float,
+    low_pass_cutoff: float,
+    filter_order: int = 5,
+    clean_reference: bool = False,
+    buffers: Optional[Dict[str, np.ndarray]] = None,
+) -> dict:
+    """
+    Performs lock-in amplification reduced to a single averaged amplitude and
+    phase.
+
+    Averaging I and Q over the last avg_length fraction of the record is a
+    boxcar low-pass filter evaluated at one point, so the per-sample filter and
+    the full-length amplitude/phase arrays of perform_lock_in are skipped. The
+    window is trimmed to a whole number of reference periods so the 2f ripple
+    averages out. If it holds fewer than _MIN_AVERAGED_PERIODS periods, the
+    record is filtered with perform_lock_in (low_pass_cutoff, filter_order)
+    instead and its amplitude and phase are averaged over the window.
+
+    buffers is used as in perform_lock_in; the returned values are plain floats,
+    so unlike there nothing in the result aliases it.
+    """
+    # Scope samples carry far less than single precision, so work in float32
+    # (a no-op for drivers that already deliver it)
+    ref_dat = np.asarray(ampl_data.ref_dat, dtype=np.float32)
+    aqu_dat = np.asarray(ampl_data.aqu_dat, dtype=np.float32)
+    time_increment = ampl_data.time_increment
+
+    N = len(ref_dat)
+    start_idx = min(int(N * (1 - avg_length)), N - 1)
+
+    if clean_reference:
+        fundamental_freq = extract_fundamental_frequency_zc(ref_dat, time_increment)
+    else:
+        fundamental_freq = extract_fundamental_frequency(ref_dat, time_increment)
+    logger.debug(f"Fundamental Frequency: {fundamental_freq:.2f} Hz")
+
+    period = 1.0 / (fundamental_freq * time_increment)  # In samples
+    n_periods = int((N - start_idx) / period)
+    if n_periods < _MIN_AVERAGED_PERIODS:
+        logger.debug(
+            f"Averaging window holds {n_periods} reference periods, filtering instead"
+        )
+        results = perform_lock_in(
+            ampl_data,
+            low_pass_cutoff,
+            filter_order=filter_order,
+            buffers=buffers,
+            fundamental_freq=fundamental_freq,
+        )
+        return {
+            "amplitude": float(np.mean(results["amplitude"][start_idx:])),
+            "phase": float(np.mean(results["phase"][start_idx:])),
+            "fundamental_freq": results["fundamental_freq"],
+        }
+
+    # Average over the last whole number of periods in the window
+    start_idx = N - round(n_periods * period)
+
+    cos_ref, sin_ref = generate_reference_signals(
+        fundamental_freq, N, time_increment, buffers
+    )
+
+    # Mean of the demodulated data over the averaging window (the 1/n factor is
+    # applied to the amplitude only, it cancels inside atan2)
+    aqu_tail = aqu_dat[start_idx:]
+    I_sum = float(np.dot(aqu_tail, cos_ref[start_idx:]))
+    Q_sum = float(np.dot(aqu_tail, sin_ref[start_idx:]))
+    amplitude = 2 * math.hypot(I_sum, Q_sum) / len(aqu_tail)
+
+    # Correct phase offset due to zero phase reference (also taken over whole
+    # periods, the most the record holds)
+    ref_start = N - round(int(N / period) * period)
+    ref_tail = ref_dat[ref_start:]
+    ref_phase = math.atan2(
+        float(np.dot(ref_tail, sin_ref[ref_start:])),
+        float(np.dot(ref_tail, cos_ref[ref_start:])),
+    )
+    phase = math.atan2(Q_sum, I_sum) - ref_phase
+
+    return {
+        "amplitude": amplitude,
+        "phase": phase,
+        "fundamental_freq": fundamental_freq,
+    }
@@ -2,7 +2,7 @@ import abc
 import dataclasses
 from enum import Enum
 from functools import wraps
-from typing import Any, Callable, Dict, List, Optional, TypeVar
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, TypeVar
 
 import numpy as np
 
@@ -76,22 +76,41 @@ def allowed_vals(**constraints: List[Any]) -> Callable[[T], T]:
         setattr(func, "allowed_values", allowed_values)
         setattr(func, "argument_types", argument_types)
 
+        # Only constrained arguments need checking on each call: record their
+        # position and allowed values (also as a set for hashing lookups, unless
+        # some of them are unhashable) up front
+        constrained: List[Tuple[str, int, List[Any], Optional[FrozenSet[Any]]]] = []
+        for index, (arg, allowed) in enumerate(allowed_values.items()):
+            if allowed is None:
+                continue
+            allowed_set: Optional[FrozenSet[Any]]
+            try:
+                allowed_set = frozenset(allowed)
+            except TypeError:  # Unhashable allowed value
+                allowed_set = None
+            constrained.append((arg, index, allowed, allowed_set))
+
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
-            # Combine positional and keyword arguments into a single dictionary
-            provided_args: Dict[str, Any] = dict(zip(arg_names, args))
-            provided_args.update(kwargs)
-
             # Validate each provided argument against its allowed values
-            for arg_name, allowed_vals in allowed_values.items():
-                if arg_name in provided_args:
-                    if (
-                        allowed_vals is not None
-                        and provided_args[arg_name] not in allowed_vals
-                    ):
-                        raise ValueError(
-                            f"Invalid value for '{arg_name}'. Allowed values are {allowed_vals}."
-                        )
+            for arg_name, index, allowed_vals, allowed_set in constrained:
+                if arg_name in kwargs:
+                    value = kwargs[arg_name]
+                elif index < len(args):
+                    value = args[index]
+                else:
+                    continue
+                if allowed_set is None:
+                    allowed = value in allowed_vals
+                else:
+                    try:
+                        allowed = value in allowed_set
+                    except TypeError:  # Unhashable value
+                        allowed = value in allowed_vals
+                if not allowed:
+                    raise ValueError(
+                        f"Invalid value for '{arg_name}'. Allowed values are {allowed_vals}."
+                    )
 
             return func(*args, **kwargs)
 
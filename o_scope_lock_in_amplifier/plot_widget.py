@@ -1,12 +1,30 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QVBoxLayout, QWidget
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.figure import Figure
+import numpy as np
+
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+    from matplotlib.backends.backend_qtagg import (
+        NavigationToolbar2QT as NavigationToolbar,
+    )
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+    from matplotlib.ticker import Formatter
 
 
 class PlotWidget(QWidget):
+    _INITIAL_CAPACITY = 1024
+    _REDRAW_INTERVAL_MS = 33  # At most ~30 redraws per second
+
+    # Created by _ensure_canvas on the first plot() call
+    canvas: "FigureCanvas"
+    toolbar: "NavigationToolbar"
+    ax: "Axes"
+    line: "Line2D"
+
     def __init__(
         self, title: str, xlabel: str, ylabel: str, parent: Optional[QWidget] = None
     ) -> None:
@@ -18,6 +36,48 @@ class PlotWidget(QWidget):
         )  # Renamed to avoid conflict with QWidget.layout() method
         self.setLayout(self.main_layout)
 
+        # The Matplotlib Figure and Canvas are built lazily, so keep the labels
+        # around until then
+        self._title = title
+        self._xlabel = xlabel
+        self._ylabel = ylabel
+        self._y_formatter: Optional["Formatter"] = None
+        self.figure: Optional["Figure"] = None
+
+        # Preallocated arrays holding the data points, filled up to n_points and
+        # doubled in size whenever they run out of room
+        self.x_data = np.empty(self._INITIAL_CAPACITY)
+        self.y_data = np.empty(self._INITIAL_CAPACITY)
+        self.n_points = 0
+
+        # Points arriving faster than the redraw interval are drawn together
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(self._REDRAW_INTERVAL_MS)
+        self._redraw_timer.timeout.connect(self._redraw)
+
+        # Pixels of the axes as of the last full draw, for blitting the line
+        # over when new points fit inside the current view
+        self._background: Any = None
+        self._n_drawn = 0
+
+    def _ensure_canvas(self) -> None:
+        """
+        Create the Matplotlib Figure, Canvas and Axes if they don't exist yet.
+        """
+        if self.figure is not None:
+            return
+
+        # Matplotlib's backend setup is slow, so it's only imported once a plot
+        # is actually drawn
+        from matplotlib.backends.backend_qtagg import (
+            FigureCanvasQTAgg as FigureCanvas,
+        )
+        from matplotlib.backends.backend_qtagg import (
+            NavigationToolbar2QT as NavigationToolbar,
+        )
+        from matplotlib.figure import Figure
+
         # Initialize the Matplotlib Figure and Canvas
         self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)  # type: ignore
@@ -29,24 +89,71 @@ class PlotWidget(QWidget):
 
         # Create an Axes instance
         self.ax = self.figure.add_subplot(111)
-        self.ax.set_title(title)
-        self.ax.set_xlabel(xlabel)
-        self.ax.set_ylabel(ylabel)
+        self.ax.set_title(self._title)
+        self.ax.set_xlabel(self._xlabel)
+        self.ax.set_ylabel(self._ylabel)
+        if self._y_formatter is not None:
+            self.ax.yaxis.set_major_formatter(self._y_formatter)
 
         # Initialize the plot line (empty)
         (self.line,) = self.ax.plot([], [], "r-")  # 'r-' is a red solid line
 
-        # Lists to store the data points
-        self.x_data: List[float] = []
-        self.y_data: List[float] = []
+        # Full draws happen on rescales, resizes and toolbar interaction
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event: Any) -> None:
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)  # type: ignore
+
+    def set_y_formatter(self, formatter: "Formatter") -> None:
+        """
+        Set the y-axis major tick formatter, applied once the canvas exists.
+        """
+        self._y_formatter = formatter
+        if self.figure is not None:
+            self.ax.yaxis.set_major_formatter(formatter)
 
     def plot(self, x: float, y: float) -> None:
         """
         Add a new data point to the plot and update the display.
         """
-        self.x_data.append(x)
-        self.y_data.append(y)
-        self.line.set_data(self.x_data, self.y_data)
+        self._ensure_canvas()
+
+        n = self.n_points
+        if n == len(self.x_data):
+            self.x_data = np.resize(self.x_data, 2 * n)
+            self.y_data = np.resize(self.y_data, 2 * n)
+        self.x_data[n] = x
+        self.y_data[n] = y
+        self.n_points = n + 1
+
+        if not self._redraw_timer.isActive():
+            self._redraw_timer.start()
+
+    def _redraw(self) -> None:
+        """
+        Show the points added since the last redraw.
+        """
+        n = self.n_points
+        new_x = self.x_data[self._n_drawn : n]
+        new_y = self.y_data[self._n_drawn : n]
+        self._n_drawn = n
+        self.line.set_data(self.x_data[:n], self.y_data[:n])
+
+        x_min, x_max = self.ax.get_xlim()
+        y_min, y_max = self.ax.get_ylim()
+        if (
+            self._background is not None
+            and len(new_x)
+            and x_min <= new_x.min()
+            and new_x.max() <= x_max
+            and y_min <= new_y.min()
+            and new_y.max() <= y_max
+        ):
+            # The axes don't need to change, so only repaint the line
+            self.canvas.restore_region(self._background)  # type: ignore
+            self.ax.draw_artist(self.line)
+            self.canvas.blit(self.ax.bbox)  # type: ignore
+            return
 
         # Adjust the view limits to accommodate new data
         self.ax.relim()
@@ -59,8 +166,11 @@ class PlotWidget(QWidget):
         """
         Clear the current plot data.
         """
-        self.x_data.clear()
-        self.y_data.clear()
+        self.n_points = 0
+        self._n_drawn = 0
+        self._redraw_timer.stop()
+        if self.figure is None:
+            return
         self.line.set_data([], [])
         self.ax.relim()
         self.ax.autoscale_view()
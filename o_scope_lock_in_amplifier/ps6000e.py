@@ -40,17 +40,19 @@ logger = logging.getLogger("o_scope_lock_in_amplifier")
 _GLOBAL_PS_SEG = 0
 
 
+_LIA_TO_PS_CHAN = {
+    OscilloscopeChannels.CHANNEL_1: PicoChannel.CHANNEL_A,
+    OscilloscopeChannels.CHANNEL_2: PicoChannel.CHANNEL_B,
+    OscilloscopeChannels.CHANNEL_3: PicoChannel.CHANNEL_C,
+    OscilloscopeChannels.CHANNEL_4: PicoChannel.CHANNEL_D,
+}
+
+
 def _lia_chan_to_ps_chan(chan: OscilloscopeChannels) -> PicoChannel:
-    if chan == OscilloscopeChannels.CHANNEL_1:
-        return PicoChannel.CHANNEL_A
-    elif chan == OscilloscopeChannels.CHANNEL_2:
-        return PicoChannel.CHANNEL_B
-    elif chan == OscilloscopeChannels.CHANNEL_3:
-        return PicoChannel.CHANNEL_C
-    elif chan == OscilloscopeChannels.CHANNEL_4:
-        return PicoChannel.CHANNEL_D
-    else:
-        raise ValueError(f"No PS mapping for abstract channel: {chan}")
+    try:
+        return _LIA_TO_PS_CHAN[chan]
+    except KeyError:
+        raise ValueError(f"No PS mapping for abstract channel: {chan}") from None
 
 
 @dataclass
@@ -65,6 +67,9 @@ class _PsParams:
     samples: int
     timebase: int
     interval: float
+    # Volts per ADC count for each channel
+    ref_scale: np.float32
+    sig_scale: np.float32
 
 
 class PS6000E(OScope):
@@ -156,6 +161,11 @@ class PS6000E(OScope):
         )
         logger.info(f"Actual sample rate: {1 / interval:.3f} Hz")
 
+        # Scale factors from raw ADC counts to volts, in single precision, which
+        # is already more than the ADC resolution and is what the lock-in
+        # processing works in
+        adc_max = self._resolution.min_type.max
+
         self._setup = _PsParams(
             ref_channel=self._ref_channel,
             sig_channel=self._sig_channel,
@@ -167,6 +177,8 @@ class PS6000E(OScope):
             samples=memory_depth,
             timebase=timebase,
             interval=interval,
+            ref_scale=np.float32(ref_range.full_scale / adc_max),
+            sig_scale=np.float32(sig_range.full_scale / adc_max),
         )
 
     def get_data(self) -> AcquisitionData:
@@ -178,11 +190,15 @@ class PS6000E(OScope):
         )
 
         t0 = time.perf_counter()
+        # The capture can't be done before its own duration has passed; after
+        # that, poll at a tenth of it (1 ms to 100 ms) so short captures aren't
+        # held up by the polling interval
+        capture_time = self._setup.interval * self._setup.samples
+        time.sleep(capture_time)
+        poll_interval = min(0.1, max(0.001, capture_time / 10))
         while not self._ps.is_ready():
-            time.sleep(0.1)
-            if (time.perf_counter() - t0) > (
-                self._setup.interval * self._setup.samples * 3 + 5.0
-            ):
+            time.sleep(poll_interval)
+            if (time.perf_counter() - t0) > (capture_time * 3 + 5.0):
                 self._ps.close_unit()
                 raise RuntimeError("Capture timed out.")
 
@@ -191,13 +207,22 @@ class PS6000E(OScope):
         )
         logger.debug(f"Buffers acquired in {time.perf_counter() - t0:.6f}s")
 
+        # np.asarray views the driver's sample buffers without copying them
+        # (when they expose the buffer protocol), so each channel is converted
+        # and scaled in a single pass. The outputs are fresh arrays because the
+        # driver buffers are refilled by the next capture while this one may
+        # still be queued for processing.
         return AcquisitionData(
-            ref_dat=np.array(self._setup.ref_buf.buffer)
-            / self._setup.resolution.min_type.max
-            * self._setup.ref_range.full_scale,
-            aqu_dat=np.array(self._setup.sig_buf.buffer)
-            / self._setup.resolution.min_type.max
-            * self._setup.sig_range.full_scale,
+            ref_dat=np.multiply(
+                np.asarray(self._setup.ref_buf.buffer),
+                self._setup.ref_scale,
+                dtype=np.float32,
+            ),
+            aqu_dat=np.multiply(
+                np.asarray(self._setup.sig_buf.buffer),
+                self._setup.sig_scale,
+                dtype=np.float32,
+            ),
             time_increment=self._setup.interval,
             time_origin=0.0,
         )
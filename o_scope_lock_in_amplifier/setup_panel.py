@@ -1,9 +1,22 @@
 # setup_panel.py
 
+from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache, partial
 import inspect
 import logging
-from typing import Any, Dict, List, Optional, Type
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
 
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QDoubleValidator, QIntValidator
@@ -21,7 +34,7 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
-from o_scope_lock_in_amplifier import scope_types
+from o_scope_lock_in_amplifier import get_scope_types
 from o_scope_lock_in_amplifier.oscilloscope_utils import OScope
 
 logger = logging.getLogger("o_scope_lock_in_amplifier")
@@ -45,6 +58,10 @@ class TypeHandler:
 
 # Handler for integer types
 class IntHandler(TypeHandler):
+    # One validator is shared by every field (a validator can be set on any
+    # number of line edits); created on first use, once Qt is up
+    _validator: Optional[QIntValidator] = None
+
     def create_widget(
         self,
         annotation: Any,
@@ -52,9 +69,10 @@ class IntHandler(TypeHandler):
         default: Any = None,
     ) -> QLineEdit:
         line_edit = QLineEdit()
-        int_validator = QIntValidator()
-        int_validator.setBottom(0)  # Adjust as needed
-        line_edit.setValidator(int_validator)
+        if self._validator is None:
+            self._validator = QIntValidator()
+            self._validator.setBottom(0)  # Adjust as needed
+        line_edit.setValidator(self._validator)
         if default is not None:
             line_edit.setText(str(default))
         return line_edit
@@ -68,7 +86,7 @@ class IntHandler(TypeHandler):
         text = widget.text()
         try:
             value = int(text)
-            logger.debug(f"Converted QLineEdit text '{text}' to int '{value}'")
+            logger.debug("Converted QLineEdit text '%s' to int '%s'", text, value)
             return value
         except ValueError:
             logger.error(f"Failed to convert '{text}' to int.")
@@ -77,6 +95,9 @@ class IntHandler(TypeHandler):
 
 # Handler for float types
 class FloatHandler(TypeHandler):
+    # Shared by every field, as for IntHandler
+    _validator: Optional[QDoubleValidator] = None
+
     def create_widget(
         self,
         annotation: Any,
@@ -84,9 +105,10 @@ class FloatHandler(TypeHandler):
         default: Any = None,
     ) -> QLineEdit:
         line_edit = QLineEdit()
-        double_validator = QDoubleValidator()
-        double_validator.setBottom(0.0)  # Adjust as needed
-        line_edit.setValidator(double_validator)
+        if self._validator is None:
+            self._validator = QDoubleValidator()
+            self._validator.setBottom(0.0)  # Adjust as needed
+        line_edit.setValidator(self._validator)
         if default is not None:
             line_edit.setText(str(default))
         return line_edit
@@ -100,7 +122,7 @@ class FloatHandler(TypeHandler):
         text = widget.text()
         try:
             value = float(text)
-            logger.debug(f"Converted QLineEdit text '{text}' to float '{value}'")
+            logger.debug("Converted QLineEdit text '%s' to float '%s'", text, value)
             return value
         except ValueError:
             logger.error(f"Failed to convert '{text}' to float.")
@@ -127,10 +149,14 @@ class StrHandler(TypeHandler):
             )
             return None
         text = widget.text()
-        logger.debug(f"QLineEdit text: {text}")
+        logger.debug("QLineEdit text: %s", text)
         return text
 
 
+def _split_list(text: str) -> List[str]:
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
 # Handler for list types
 class ListHandler(TypeHandler):
     def create_widget(
@@ -151,8 +177,8 @@ class ListHandler(TypeHandler):
             )
             return None
         text = widget.text()
-        value = [item.strip() for item in text.split(",") if item.strip()]
-        logger.debug(f"Converted QLineEdit text '{text}' to list '{value}'")
+        value = _split_list(text)
+        logger.debug("Converted QLineEdit text '%s' to list '%s'", text, value)
         return value
 
 
@@ -180,7 +206,7 @@ class EnumHandler(TypeHandler):
         try:
             value = annotation[current_text]
             logger.debug(
-                f"Converted QComboBox selection '{current_text}' to Enum '{value}'"
+                "Converted QComboBox selection '%s' to Enum '%s'", current_text, value
             )
             return value
         except KeyError:
@@ -210,10 +236,31 @@ class BoolHandler(TypeHandler):
             )
             return None
         value = widget.isChecked()
-        logger.debug(f"QCheckBox isChecked: {value}")
+        logger.debug("QCheckBox isChecked: %s", value)
         return value
 
 
+# Conversions from a combo box selection to each supported (non-Enum) type,
+# keyed by the annotation (or its origin, for generics such as List[str])
+_CONVERTERS: Dict[Any, Callable[[str], Any]] = {
+    int: int,
+    float: float,
+    str: str,
+    list: _split_list,
+}
+
+
+@lru_cache(maxsize=None)
+def _combo_converter(annotation: Any) -> Optional[Callable[[str], Any]]:
+    """
+    Return the conversion for a combo box selection to annotation, or None if
+    the type isn't supported.
+    """
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return annotation.__getitem__
+    return _CONVERTERS.get(getattr(annotation, "__origin__", annotation))
+
+
 # Handler for ComboBox with allowed values (for non-Enum types)
 class ComboBoxHandler(TypeHandler):
     def create_widget(
@@ -237,53 +284,147 @@ class ComboBoxHandler(TypeHandler):
             )
             return None
         current_text = widget.currentText()
+        converter = _combo_converter(annotation)
+        if converter is None:
+            logger.warning(f"Unsupported type '{annotation}' for ComboBoxHandler.")
+            return current_text
         try:
-            if isinstance(annotation, type) and issubclass(annotation, Enum):
-                value = annotation[current_text]
-                logger.debug(
-                    f"Converted QComboBox selection '{current_text}' to Enum '{value}'"
-                )
-                return value
-            elif annotation == int:
-                int_value = int(current_text)
-                logger.debug(
-                    f"Converted QComboBox selection '{current_text}' to int '{int_value}'"
-                )
-                return int_value
-            elif annotation == float:
-                float_value = float(current_text)
-                logger.debug(
-                    f"Converted QComboBox selection '{current_text}' to float '{float_value}'"
-                )
-                return float_value
-            elif annotation == str:
-                logger.debug(f"QComboBox selected value: {current_text}")
-                return current_text
-            elif getattr(annotation, "__origin__", None) == list:
-                list_value = [
-                    item.strip() for item in current_text.split(",") if item.strip()
-                ]
-                logger.debug(
-                    f"Converted QComboBox selection '{current_text}' to list '{list_value}'"
-                )
-                return list_value
-            else:
-                logger.warning(f"Unsupported type '{annotation}' for ComboBoxHandler.")
-                return current_text
+            value = converter(current_text)
         except (ValueError, KeyError) as e:
             logger.error(f"Failed to convert '{current_text}' to {annotation}: {e}")
             return None
+        logger.debug(
+            "Converted QComboBox selection '%s' to %s '%s'",
+            current_text,
+            annotation,
+            value,
+        )
+        return value
 
 
-# Registry mapping types to their handlers
-TYPE_HANDLERS: Dict[Any, TypeHandler] = {
-    int: IntHandler(),
-    float: FloatHandler(),
-    str: StrHandler(),
-    list: ListHandler(),
-    bool: BoolHandler(),
-    # Enums are handled separately via ComboBoxHandler
-}
+# One instance of each handler is shared by every parameter
+_STR_HANDLER = StrHandler()
+_COMBO_HANDLER = ComboBoxHandler()
+_ENUM_HANDLER = EnumHandler()
+
+# Registry mapping types to their handlers (read-only)
+TYPE_HANDLERS: Mapping[Any, TypeHandler] = MappingProxyType(
+    {
+        int: IntHandler(),
+        float: FloatHandler(),
+        str: _STR_HANDLER,
+        list: ListHandler(),
+        bool: BoolHandler(),
+        # Enums are handled separately via ComboBoxHandler
+    }
+)
+
+
+def _resolve_handler(
+    annotation: Any, allowed_values: Optional[List[Any]] = None
+) -> TypeHandler:
+    """
+    Return the handler for a parameter, based on its type annotation and allowed
+    values.
+    """
+    if allowed_values:
+        # Use ComboBoxHandler for parameters with allowed values
+        return _COMBO_HANDLER
+    elif isinstance(annotation, type) and issubclass(annotation, Enum):
+        # Use EnumHandler for Enum types without allowed values
+        return _ENUM_HANDLER
+    else:
+        # Use appropriate TypeHandler based on annotation
+        return TYPE_HANDLERS.get(annotation, _STR_HANDLER)
+
+
+@dataclass(frozen=True, slots=True)
+class MethodCfg:
+    """
+    Argument widgets of one method (or of __init__), with each argument's type
+    annotation and the handler that reads its widget, as parallel tuples.
+    """
+
+    names: Tuple[str, ...] = ()
+    widgets: Tuple[QWidget, ...] = ()
+    annotations: Tuple[Any, ...] = ()
+    handlers: Tuple[TypeHandler, ...] = ()
+
+
+# (name, annotation, default) of each parameter of a routine, without self;
+# the default is None where the parameter has none
+_Parameters = Tuple[Tuple[str, Any, Any], ...]
+
+
+def _parameters(func: Callable[..., Any]) -> _Parameters:
+    """
+    Return the parameters of a routine, skipping 'self'.
+    """
+    return tuple(
+        (
+            param.name,
+            param.annotation,
+            param.default if param.default is not inspect.Parameter.empty else None,
+        )
+        for param in inspect.signature(func).parameters.values()
+        if param.name != "self"
+    )
+
+
+@lru_cache(maxsize=None)
+def _init_parameters(scope_class: Type[OScope]) -> _Parameters:
+    """
+    Return the __init__ parameters of a scope class (reflected once per class).
+    """
+    return _parameters(scope_class.__init__)
+
+
+# allowed_values of methods without the allowed_vals decorator (one shared,
+# read-only instance rather than an empty dict per method)
+_NO_ALLOWED_VALUES: Mapping[str, List[Any]] = MappingProxyType({})
+
+
+def _iter_methods(scope_class: Type[OScope]) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield the public routines of a class (including inherited ones) as
+    (name, method) pairs, sorted by name like inspect.getmembers.
+
+    Only the names defined along the MRO are looked at, and private ones are
+    skipped before anything is fetched from the class.
+    """
+    names = {
+        name
+        for base in scope_class.__mro__
+        for name in vars(base)
+        if not name.startswith("_")
+    }
+    for name in sorted(names):
+        method = getattr(scope_class, name)
+        if inspect.isroutine(method):
+            yield name, method
+
+
+@lru_cache(maxsize=None)
+def _public_methods(
+    scope_class: Type[OScope],
+) -> Tuple[Tuple[str, _Parameters, Mapping[str, List[Any]]], ...]:
+    """
+    Return the public methods of a scope class as (name, parameters,
+    allowed_values) entries.
+
+    Scope classes don't change at runtime, so the reflection (including the
+    signatures) is done once per class. Private/protected methods (including
+    __init__) are skipped. allowed_values comes from the allowed_vals
+    decorator and is empty for undecorated methods.
+    """
+    return tuple(
+        (
+            name,
+            _parameters(method),
+            getattr(method, "allowed_values", _NO_ALLOWED_VALUES),
+        )
+        for name, method in _iter_methods(scope_class)
+    )
 
 
 class SetupPanel(QWidget):
@@ -296,15 +437,16 @@ class SetupPanel(QWidget):
         self.main_layout = QVBoxLayout()
 
         # Dictionary to hold method configurations
-        # Key: method name, Value: dict of argument widgets
-        self.method_configs: Dict[str, Dict[str, QWidget]] = {}
+        # Key: method name, Value: the method's argument widgets
+        self.method_configs: Dict[str, MethodCfg] = {}
 
-        # Dictionary to map widgets to their parameter types
-        self.widget_to_type: Dict[QWidget, Any] = {}
+        # Oscilloscope types are only resolved (and their driver modules
+        # imported) once the panel is actually built
+        self.scope_types: List[Type[OScope]] = get_scope_types()
 
         # Dropdown for oscilloscope types
         self.scope_type_combo = QComboBox()
-        self.scope_type_combo.addItems([scope.__name__ for scope in scope_types])
+        self.scope_type_combo.addItems([scope.__name__ for scope in self.scope_types])
         self.scope_type_combo.currentIndexChanged.connect(self.populate_init_config)
 
         # GroupBox for Oscilloscope Initialization (__init__ parameters)
@@ -312,8 +454,20 @@ class SetupPanel(QWidget):
         self.init_layout = QFormLayout()
         self.init_group_box.setLayout(self.init_layout)
 
-        # Dictionary to hold init parameter widgets
-        self.init_params_widgets: Dict[str, QWidget] = {}
+        # Init parameter widgets of the selected oscilloscope
+        self.init_config = MethodCfg()
+
+        # Every init parameter row created so far (with its handler), keyed by
+        # (scope class, parameter name); rows are hidden/shown instead of rebuilt
+        self._init_row_pool: Dict[
+            Tuple[Type[OScope], str], Tuple[QWidget, TypeHandler]
+        ] = {}
+
+        # Method group boxes (and their configurations) built for each scope
+        # class so far; initializing the same class again re-attaches them
+        self._method_ui_cache: Dict[
+            Type[OScope], Tuple[List[QGroupBox], Dict[str, MethodCfg]]
+        ] = {}
 
         # Scroll area for method configurations
         self.scroll_area = QScrollArea()
@@ -349,47 +503,51 @@ class SetupPanel(QWidget):
         """
         Populate the initialization configuration based on the selected oscilloscope's __init__ parameters.
         """
-        # Clear existing init parameter widgets
-        while self.init_layout.count():
-            child = self.init_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-        self.init_params_widgets.clear()
+        # Hide the rows of the previously selected oscilloscope; they stay in
+        # the pool so switching back doesn't have to recreate them
+        for widget in self.init_config.widgets:
+            self.init_layout.setRowVisible(widget, False)
 
         # Get selected oscilloscope class
-        scope_class = scope_types[index]
-
-        # Inspect __init__ method
-        init_method = scope_class.__init__
-        sig = inspect.signature(init_method)
-        params = sig.parameters
+        scope_class = self.scope_types[index]
 
         logger.debug(f"Configuring __init__ for {scope_class.__name__}")
 
-        for name, param in params.items():
-            if name == "self":
-                continue  # Skip 'self' parameter
-
-            param_type = param.annotation
-            param_default = (
-                param.default if param.default is not inspect.Parameter.empty else None
-            )
-
-            # Create widget based on parameter type
-            widget = self.create_widget(
-                param_type, allowed_values=None, default=param_default
-            )
-
-            # Add to layout
-            self.init_layout.addRow(QLabel(f"{name}:"), widget)
-            self.init_params_widgets[name] = widget
+        params = _init_parameters(scope_class)
+        widgets: List[QWidget] = []
+        handlers: List[TypeHandler] = []
+
+        # Walk the (cached) __init__ parameters
+        for name, param_type, param_default in params:
+            pooled = self._init_row_pool.get((scope_class, name))
+            if pooled is not None:
+                # Reuse the row built the last time this scope was selected
+                widget, handler = pooled
+                self.init_layout.setRowVisible(widget, True)
+            else:
+                # Create widget based on parameter type
+                handler = _resolve_handler(param_type)
+                widget = handler.create_widget(param_type, default=param_default)
 
-            # Map widget to its parameter type
-            self.widget_to_type[widget] = param_type
+                # Add to layout
+                self.init_layout.addRow(QLabel(f"{name}:"), widget)
+                self._init_row_pool[(scope_class, name)] = (widget, handler)
 
-            logger.debug(
-                f"Added init parameter: {name} (type: {param_type}, default: {param_default})"
-            )
+                logger.debug(
+                    "Added init parameter: %s (type: %s, default: %s)",
+                    name,
+                    param_type,
+                    param_default,
+                )
+            widgets.append(widget)
+            handlers.append(handler)
+
+        self.init_config = MethodCfg(
+            names=tuple(name for name, _, _ in params),
+            widgets=tuple(widgets),
+            annotations=tuple(annotation for _, annotation, _ in params),
+            handlers=tuple(handlers),
+        )
 
     def initialize_oscilloscope(self) -> None:
         """
@@ -397,18 +555,12 @@ class SetupPanel(QWidget):
         Then, populate the method configurations.
         """
         index = self.scope_type_combo.currentIndex()
-        scope_class = scope_types[index]
+        scope_class = self.scope_types[index]
 
         # Prepare __init__ arguments
-        init_kwargs = {}
-        for name, widget in self.init_params_widgets.items():
-            value = self.get_value(widget)
-            if value is None:
-                QMessageBox.warning(
-                    self, "Invalid Input", f"Invalid value for parameter '{name}'."
-                )
-                return
-            init_kwargs[name] = value
+        init_kwargs = self.collect_arguments(self.init_config)
+        if init_kwargs is None:
+            return
 
         logger.debug(
             f"Initializing oscilloscope {scope_class.__name__} with args: {init_kwargs}"
@@ -445,101 +597,122 @@ class SetupPanel(QWidget):
         Populate the method configurations based on the oscilloscope's methods.
         Each method will have its own QGroupBox with input widgets and a Run button.
         """
-        # Clear existing method configurations
+        # Hold off repainting while the group boxes are swapped, so the scroll
+        # area is laid out and painted once rather than after every method
+        self.scroll_content.setUpdatesEnabled(False)
+        try:
+            self._build_method_config(scope_class)
+        finally:
+            self.scroll_content.setUpdatesEnabled(True)
+
+    def _build_method_config(self, scope_class: Type[OScope]) -> None:
+        # Clear existing method configurations; the group boxes stay (hidden)
+        # in the cache for when that scope is initialized again
         while self.scroll_layout.count():
             child = self.scroll_layout.takeAt(0)
             if child.widget():
-                child.widget().deleteLater()
+                child.widget().hide()
         self.method_configs.clear()
 
-        logger.debug(f"Populating method configurations for {scope_class.__name__}")
-
-        # Inspect all callable members, including inherited ones
-        for name, method in inspect.getmembers(
-            scope_class, predicate=inspect.isroutine
-        ):
-            if name.startswith("_"):
-                continue  # Skip private/protected methods
-            if not callable(method):
-                # Ensure it's callable
-                continue  # type: ignore
-
-            # Skip __init__, already handled
-            if name == "__init__":
-                continue
-
-            # Get method signature
-            sig = inspect.signature(method)
-            params = sig.parameters
+        cached = self._method_ui_cache.get(scope_class)
+        if cached is not None:
+            # Run buttons look up the oscilloscope when clicked, so the widgets
+            # can be reused as they are
+            group_boxes, method_configs = cached
+            for group_box in group_boxes:
+                self.scroll_layout.addWidget(group_box)
+                group_box.show()
+            self.method_configs.update(method_configs)
+            self.scroll_layout.addStretch()
+            logger.debug(f"Reusing method configurations for {scope_class.__name__}")
+            return
 
-            # Exclude 'self' parameter
-            args = [param for param in params.values() if param.name != "self"]
+        logger.debug(f"Populating method configurations for {scope_class.__name__}")
+        group_boxes = []
 
+        # Walk the (cached) public methods, including inherited ones, with
+        # their parameters and the 'allowed_values' attribute from the decorator
+        for name, args, allowed_values in _public_methods(scope_class):
             # Create a QGroupBox for the method
             group_box = QGroupBox(name)
             group_layout = QFormLayout()
 
-            # Dictionary to hold argument widgets for this method
-            arg_widgets: Dict[str, QWidget] = {}
+            # Argument widgets for this method, and the handlers reading them
+            arg_widgets: List[QWidget] = []
+            arg_handlers: List[TypeHandler] = []
 
-            # Check if the method has 'allowed_values' attribute from the decorator
-            allowed_values = getattr(method, "allowed_values", {})
+            for arg_name, arg_annotation, arg_default in args:
+                # Allowed values from the decorator, if this argument has any
+                arg_allowed = allowed_values.get(arg_name) or None
 
-            for arg in args:
-                arg_name = arg.name
-                arg_annotation = arg.annotation
-                arg_default = (
-                    arg.default if arg.default is not inspect.Parameter.empty else None
+                # Determine widget based on type annotation and allowed values
+                handler = _resolve_handler(arg_annotation, arg_allowed)
+                widget = handler.create_widget(
+                    arg_annotation, allowed_values=arg_allowed, default=arg_default
                 )
 
-                # Determine if this argument has allowed values from the decorator
-                if arg_name in allowed_values and allowed_values[arg_name]:
-                    widget = self.create_widget(
-                        annotation=arg_annotation,
-                        allowed_values=allowed_values[arg_name],
-                        default=arg_default,
-                    )
-                else:
-                    # Determine widget based on type annotation
-                    widget = self.create_widget(
-                        annotation=arg_annotation,
-                        allowed_values=None,
-                        default=arg_default,
-                    )
-
                 group_layout.addRow(QLabel(arg_name + ":"), widget)
-                arg_widgets[arg_name] = widget
-
-                # Map widget to its parameter type
-                self.widget_to_type[widget] = arg_annotation
+                arg_widgets.append(widget)
+                arg_handlers.append(handler)
 
                 logger.debug(
-                    f"Added method parameter: {name}.{arg_name} (type: {arg_annotation}, default: {arg_default})"
+                    "Added method parameter: %s.%s (type: %s, default: %s)",
+                    name,
+                    arg_name,
+                    arg_annotation,
+                    arg_default,
                 )
 
+            method_cfg = MethodCfg(
+                names=tuple(arg_name for arg_name, _, _ in args),
+                widgets=tuple(arg_widgets),
+                annotations=tuple(annotation for _, annotation, _ in args),
+                handlers=tuple(arg_handlers),
+            )
+
             # Add Run button for the method
             run_button = QPushButton(f"Run {name}")
-            # Use default arguments in lambda to capture current method and widgets
-            run_button.clicked.connect(
-                lambda checked, m=name, aw=arg_widgets: self.run_method(m, aw)
-            )
+            # Bind the current method and widgets (PySide drops the checked
+            # argument that the partial doesn't take)
+            run_button.clicked.connect(partial(self.run_method, name, method_cfg))
 
             # Layout setup
             group_layout.addRow(run_button)
             group_box.setLayout(group_layout)
             self.scroll_layout.addWidget(group_box)
+            group_boxes.append(group_box)
 
             # Store the argument widgets for this method
-            self.method_configs[name] = arg_widgets
+            self.method_configs[name] = method_cfg
 
             logger.debug(
-                f"Configured method: {name} with arguments: {list(arg_widgets.keys())}"
+                "Configured method: %s with arguments: %s", name, list(method_cfg.names)
             )
 
         # Add stretch to push widgets to the top
         self.scroll_layout.addStretch()
 
-    def run_method(self, method_name: str, args_widgets: Dict[str, QWidget]) -> None:
+        self._method_ui_cache[scope_class] = (group_boxes, dict(self.method_configs))
+
+    def collect_arguments(self, cfg: MethodCfg) -> Optional[Dict[str, Any]]:
+        """
+        Read the argument values from a method's widgets, warning about (and
+        returning None for) the first invalid one.
+        """
+        kwargs = {}
+        for arg_name, widget, annotation, handler in zip(
+            cfg.names, cfg.widgets, cfg.annotations, cfg.handlers
+        ):
+            value = handler.get_value(widget, annotation)
+            if value is None:
+                QMessageBox.warning(
+                    self, "Invalid Input", f"Invalid value for parameter '{arg_name}'."
+                )
+                return None
+            kwargs[arg_name] = value
+        return kwargs
+
+    def run_method(self, method_name: str, cfg: MethodCfg) -> None:
         """
         Execute a single method with the provided arguments.
         """
@@ -552,15 +725,9 @@ class SetupPanel(QWidget):
             return
 
         # Prepare arguments
-        kwargs = {}
-        for arg_name, widget in args_widgets.items():
-            value = self.get_value(widget)
-            if value is None:
-                QMessageBox.warning(
-                    self, "Invalid Input", f"Invalid value for parameter '{arg_name}'."
-                )
-                return
-            kwargs[arg_name] = value
+        kwargs = self.collect_arguments(cfg)
+        if kwargs is None:
+            return
 
         logger.debug(f"Running method {method_name} with arguments {kwargs}")
 
@@ -579,50 +746,3 @@ class SetupPanel(QWidget):
                 f"Failed to execute method '{method_name}': {e}",
             )
             logger.error(f"Error executing method '{method_name}': {e}")
-
-    def create_widget(
-        self,
-        annotation: Any,
-        allowed_values: Optional[List[Any]] = None,
-        default: Any = None,
-    ) -> QWidget:
-        """
-        Create and return a widget based on the type annotation and allowed values.
-        """
-        if allowed_values:
-            # Use ComboBoxHandler for parameters with allowed values
-            combo_handler: TypeHandler = ComboBoxHandler()
-            widget = combo_handler.create_widget(annotation, allowed_values, default)
-            return widget
-        elif isinstance(annotation, type) and issubclass(annotation, Enum):
-            # Use EnumHandler for Enum types without allowed values
-            enum_handler: TypeHandler = EnumHandler()
-            widget = enum_handler.create_widget(annotation, default=default)
-            return widget
-        else:
-            # Use appropriate TypeHandler based on annotation
-            handler = TYPE_HANDLERS.get(annotation, StrHandler())
-            widget = handler.create_widget(annotation, default=default)
-            return widget
-
-    def get_value(self, widget: QWidget) -> Optional[Any]:
-        """
-        Retrieve and convert the value from the widget based on its type.
-        """
-        param_type = self.widget_to_type.get(widget, None)
-
-        if isinstance(widget, QComboBox):
-            # Use ComboBoxHandler for ComboBox widgets
-            combo_handler = ComboBoxHandler()
-            return combo_handler.get_value(widget, param_type)
-        elif isinstance(widget, QLineEdit):
-            # Use appropriate TypeHandler based on param_type
-            handler = TYPE_HANDLERS.get(param_type, StrHandler())
-            return handler.get_value(widget, param_type)
-        elif isinstance(widget, QCheckBox):
-            # Use BoolHandler for CheckBox widgets
-            bool_handler = TYPE_HANDLERS.get(bool, BoolHandler())
-            return bool_handler.get_value(widget, bool)
-        else:
-            logger.error(f"Unsupported widget type: {type(widget)}")
-            return None  # Unsupported widget type
@@ -3,6 +3,7 @@
 import os
 from pathlib import Path
 import shutil
+import subprocess
 import sys
 from typing import Optional
 import unittest
@@ -12,18 +13,23 @@ from zipfile import ZipFile
 class TestUtil(unittest.TestCase):
     """Test that the built wheel includes all the files in the package."""
 
+    # Set by setUpClass
+    proj_dir: Path
+    dist_dir: Path
+
     def test_wheel_include(self) -> None:
         """Test that the built wheel includes all the files in the package."""
         self._test_wheel_include("o_scope_lock_in_amplifier")
 
-    def setUp(self) -> None:
+    @classmethod
+    def setUpClass(cls) -> None:
         """Create the wheel files for subsequent tests."""
-        self.proj_dir = Path(__file__).parent.parent.absolute()
-        self.dist_dir = self.proj_dir / "dist"
+        cls.proj_dir = Path(__file__).parent.parent.absolute()
+        cls.dist_dir = cls.proj_dir / "dist"
 
         # Clean "dist" directory.
         try:
-            shutil.rmtree(self.dist_dir)
+            shutil.rmtree(cls.dist_dir)
         except FileNotFoundError:
             # Already clean!
             pass
@@ -32,8 +38,7 @@ class TestUtil(unittest.TestCase):
         if (sys.executable is None) or (len(sys.executable) < 1):
             raise RuntimeError("Unknown interpreter!")
         interpeter = sys.executable
-        os.chdir(self.proj_dir)
-        os.system(f'"{interpeter}" -m build --wheel')
+        subprocess.check_call([interpeter, "-m", "build", "--wheel"], cwd=cls.proj_dir)
 
     def _test_wheel_include(
         self, mod_dir_name: str, mod_whl_name: Optional[str] = None
@@ -44,39 +49,44 @@ class TestUtil(unittest.TestCase):
         mod_dir = self.proj_dir / mod_dir_name
 
         # Get wheel file and ensure there's only one.
-        wheel_files = list(self.dist_dir.glob(f"{mod_whl_name}*.whl"))
+        with os.scandir(self.dist_dir) as entries:
+            wheel_files = [
+                entry.path
+                for entry in entries
+                if entry.name.startswith(mod_whl_name) and entry.name.endswith(".whl")
+            ]
         self.assertEqual(
             len(wheel_files),
             1,
             f"{len(wheel_files)} wheels detected for {mod_whl_name} (expected 1)!",
         )
         wheel_file = wheel_files[0]
-        zip_dir_filelist = list()
+        prefix = f"{mod_dir_name}/"
 
-        # Get list of files in wheel (which is a ZIP file).
+        # Get set of files in wheel (which is a ZIP file), as paths relative to
+        # the package dir.
+        # Zip module uses foward slashes regardless of the os.sep.
         with ZipFile(wheel_file, "r") as zipf:
-            for f in zipf.namelist():
-                if f.startswith(f"{mod_dir_name}/") and "__pycache__" not in f:
-                    # Find files in the package dir in the wheel and strip the
-                    # package prefix.
-                    # Zip module uses foward slashes regardless of the os.sep.
-                    # There's probably a smarter way to construct this Path...
-                    zip_dir_filelist.append(Path(f[len(f"{mod_dir_name}/") :]))
+            zip_dir_files = {
+                f[len(prefix) :]
+                for f in zipf.namelist()
+                if f.startswith(prefix) and "__pycache__" not in f
+            }
 
-        real_dir_filelist = [
-            # Strip full path info off, so it matches zip listings
-            f.relative_to(mod_dir)
-            # Glob for all files in the module directory
-            for f in mod_dir.glob("**/*")
-            # Remove __pycache__ directories and pure directories
-            if "__pycache__" not in str(f) and not f.is_dir()
-        ]
+        real_dir_files = set()
+        # Walk the module directory, pruning __pycache__ directories so they
+        # aren't descended into
+        for root, dirs, files in os.walk(mod_dir):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            for name in files:
+                # Strip full path info off, so it matches zip listings
+                rel = os.path.relpath(os.path.join(root, name), mod_dir)
+                real_dir_files.add(rel.replace(os.sep, "/"))
 
-        # Test that sequence first contains the same elements as second,
-        # regardless of their order.
+        # Test that the wheel and the package dir hold the same files.
         self.maxDiff = 1000000
-        self.assertCountEqual(
-            zip_dir_filelist,
-            real_dir_filelist,
+        self.assertSetEqual(
+            zip_dir_files,
+            real_dir_files,
             "Wheel is not in sync with source directory.",
         )